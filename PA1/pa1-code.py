@@ -1,6 +1,8 @@
 import sys
 import random
 import os
+import operator
+from itertools import accumulate
 
 # Validate command line arguments
 def validate_user_input():
@@ -45,13 +47,15 @@ def validate_user_input():
 # UUniFast algorithm that generates random utilization values for each task
 # E. Bini and G. Buttazzo. 2005. Measuring the performance of schedulability tests
 def uunifast_algo(number_of_tasks, sum_of_utilization):
-    utilization_of_tasks = []
-    sumU = sum_of_utilization
-    for i in range(1, number_of_tasks):
-        nextSumU = sumU * (random.random() ** (1 / (number_of_tasks - i))) 
-        utilization_of_tasks.append(sumU - nextSumU) 
-        sumU = nextSumU  
-    utilization_of_tasks.append(sumU)
+    # remaining utilization after each task: U, U*r1^(1/(n-1)), U*r1^(1/(n-1))*r2^(1/(n-2)), ...
+    remaining_sums = list(accumulate(
+        (random.random() ** (1 / (number_of_tasks - i)) for i in range(1, number_of_tasks)),
+        operator.mul,
+        initial=sum_of_utilization,
+    ))
+    # utilization of each task is the difference of consecutive remaining sums, the last takes the rest
+    utilization_of_tasks = [sumU - nextSumU for sumU, nextSumU in zip(remaining_sums, remaining_sums[1:])]
+    utilization_of_tasks.append(remaining_sums[-1])
 
     return utilization_of_tasks
 
@@ -76,13 +80,16 @@ def main():
     os.makedirs(output_dir, exist_ok=True)
     filename = f"{output_dir}/2020310083_{number_of_tasks}_{sum_of_utilization}_{is_explicit_deadline}.txt"
 
-    # Open the file (write mode) and write the task setss
-    with open(filename, "w") as file:
-        for i in range(100):
-            tasks = generate_tasks(number_of_tasks, sum_of_utilization, is_explicit_deadline)
-            file.write(f"{number_of_tasks} {sum_of_utilization} {is_explicit_deadline} ")
-            for task in tasks:
-                file.write(f"{task[0]} {task[1]} {task[2]} ")
-            file.write("\n")
+    # Build all task sets in memory, one line per task set
+    lines = []
+    for i in range(100):
+        tasks = generate_tasks(number_of_tasks, sum_of_utilization, is_explicit_deadline)
+        parts = [f"{number_of_tasks} {sum_of_utilization} {is_explicit_deadline}"]
+        parts.extend(f"{period} {wcet} {relative_deadline}" for period, wcet, relative_deadline in tasks)
+        lines.append(" ".join(parts))
+
+    # Open the file (binary write mode) and write the encoded task sets at once
+    with open(filename, "wb") as file:
+        file.write(("\n".join(lines) + "\n").encode())
     
 main()
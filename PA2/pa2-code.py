@@ -1,9 +1,8 @@
 import sys
 import os
-from functools import reduce
 import math
 from multiprocessing import Pool
-from heapq import heappush, heappop, heapify
+from heapq import heappush, heappop, heapify, heapreplace
 import time
 
 
@@ -32,83 +31,117 @@ class TaskScheduler:
         self.next_activations = self.periods[:]
         self.is_active = [True] * self.num_tasks
 
+        # choose the priority key of the scheduling algorithm once
+        # (each key list is updated in place, so the binding stays valid)
+        if scheduling_algorithm == "EDF":
+            # min absolute deadline
+            self.priority_keys = self.absolute_deadlines
+        elif scheduling_algorithm == "RM":
+            # min period
+            self.priority_keys = self.periods
+        elif scheduling_algorithm == "SJF":
+            # min remaining execution time
+            self.priority_keys = self.remain_execution_times
+        else:  # FCFS
+            # earliest activation time
+            self.priority_keys = self.activation_times
+
         # put all tasks in the ready queue (synchronous activation)
-        self.ready_queue = [
-            (self.get_task_priority(i)[0], i) for i in range(self.num_tasks)
-        ]
+        self.ready_queue = [self.get_task_priority(i) for i in range(self.num_tasks)]
         heapify(self.ready_queue)
         self.current_task = None
 
+        # absolute deadlines of the active jobs (entries of completed jobs are removed lazily)
+        self.deadline_heap = [
+            (self.absolute_deadlines[i], i) for i in range(self.num_tasks)
+        ]
+        heapify(self.deadline_heap)
+
+        # next activation time of each task (the earliest one is at the top)
+        self.activation_heap = [
+            (self.next_activations[i], i) for i in range(self.num_tasks)
+        ]
+        heapify(self.activation_heap)
+
     """
     function to get the priority of a task based on the scheduling algorithm
     """
 
     def get_task_priority(self, index):
-        if self.scheduling_algorithm == "EDF":
-            # min absolute deadline
-            return self.absolute_deadlines[index], index
-        elif self.scheduling_algorithm == "RM":
-            # min period
-            return self.periods[index], index
-        elif self.scheduling_algorithm == "SJF":
-            # min remaining execution time
-            return self.remain_execution_times[index], index
-        else:  # FCFS
-            # earliest activation time
-            return self.activation_times[index], index
+        return self.priority_keys[index], index
 
     """
     function to update the task parameters for the next period
     """
 
     def next_period(self, current_time):
-        for i in range(self.num_tasks):
-            if current_time >= self.next_activations[i]:
-                self.activation_times[i] = self.next_activations[i]
-                self.absolute_deadlines[i] = (
-                    self.activation_times[i] + self.relative_deadlines[i]
-                )
-                self.remain_execution_times[i] = self.wcets[i]
-                self.is_active[i] = True
-                self.next_activations[i] += self.periods[i]
-
-                # Add to ready queue with updated priority
-                heappush(self.ready_queue, (self.get_task_priority(i)[0], i))
+        # only the tasks at the top of the activation heap can be activated
+        while self.activation_heap and current_time >= self.activation_heap[0][0]:
+            _, i = heappop(self.activation_heap)
+
+            self.activation_times[i] = self.next_activations[i]
+            self.absolute_deadlines[i] = (
+                self.activation_times[i] + self.relative_deadlines[i]
+            )
+            self.remain_execution_times[i] = self.wcets[i]
+            self.is_active[i] = True
+            self.next_activations[i] += self.periods[i]
+
+            # Add to ready queue with updated priority
+            heappush(self.ready_queue, self.get_task_priority(i))
+            heappush(self.deadline_heap, (self.absolute_deadlines[i], i))
+            heappush(self.activation_heap, (self.next_activations[i], i))
 
     """
-    function to execute a task for one time unit
+    function to execute a task for the given number of time units
     """
 
-    def execute_task(self, index):
-        self.remain_execution_times[index] -= 1
+    def execute_task(self, index, duration):
+        self.remain_execution_times[index] -= duration
 
         # deactivate the task if execution is complete for the current period
         if self.remain_execution_times[index] <= 0:
             self.is_active[index] = False
 
+    """
+    function to check if a deadline heap entry belongs to the current active job of the task
+    """
+
+    def is_pending_deadline(self, deadline, index):
+        return self.is_active[index] and self.absolute_deadlines[index] == deadline
+
     """
     function to calculate the hyperperiod (LCM of periods) of the task set
+    capped at the given limit (stops as soon as the partial LCM reaches the limit)
     https://labex.io/tutorials/python-calculating-least-common-multiple-13682
     """
 
-    def calculate_hyperperiod(self):
-        return reduce(lambda x, y: x * y // math.gcd(x, y), self.periods)
+    def calculate_hyperperiod(self, limit):
+        hyperperiod = 1
+        for period in self.periods:
+            hyperperiod = math.lcm(hyperperiod, period)
+            if hyperperiod >= limit:
+                return limit
+        return hyperperiod
 
     """
     function to simulate the task scheduler
     ready queue is sorted based on the scheduling algorithm
+    time jumps directly to the next event (activation, completion, deadline)
+    since the running task cannot change between two events
     """
 
     def simulate(self):
         current_time = 0
-        time_limit = min(self.calculate_hyperperiod(), 100000)
+        time_limit = self.calculate_hyperperiod(100000)
 
         while current_time < time_limit:
-            # Check deadline misses
+            # Check deadline misses (only the earliest deadlines need to be checked)
             missed_deadlines = []
-            for i in range(self.num_tasks):
-                if self.is_active[i] and current_time >= self.absolute_deadlines[i]:
-                    missed_deadlines.append((self.get_task_priority(i)[0], i))
+            while self.deadline_heap and current_time >= self.deadline_heap[0][0]:
+                deadline, i = heappop(self.deadline_heap)
+                if self.is_pending_deadline(deadline, i):
+                    missed_deadlines.append(self.get_task_priority(i))
 
             if missed_deadlines:
                 # Sort by priority and return the highest priority task index + 1
@@ -125,46 +158,68 @@ class TaskScheduler:
             else:
                 self._preemptive_step()
 
-            current_time += 1
+            # remove deadlines of completed jobs from the top of the deadline heap
+            while self.deadline_heap and not self.is_pending_deadline(
+                *self.deadline_heap[0]
+            ):
+                heappop(self.deadline_heap)
+
+            # next event: activation, deadline of an active task, or time limit
+            next_time = min(self.activation_heap[0][0], time_limit)
+            if self.deadline_heap:
+                next_time = min(next_time, self.deadline_heap[0][0])
+
+            # the running task may complete before the next event
+            if self.current_task is not None:
+                next_time = min(
+                    next_time,
+                    current_time + self.remain_execution_times[self.current_task],
+                )
+                self._run_current_task(next_time - current_time)
+
+            current_time = next_time
 
         return 0
 
+    """
+    function to run the current task until the next event
+    """
+
+    def _run_current_task(self, duration):
+        task_index = self.current_task
+        self.execute_task(task_index, duration)
+
+        if not self.is_active[task_index]:
+            self.current_task = None
+
     """
     Non-preemptive scheduling logic.
     """
 
     def _non_preemptive_step(self):
 
-        if self.current_task is not None:
-            # Execute the current task
-            self.execute_task(self.current_task)
-            # Reset if task is not active
-            if not self.is_active[self.current_task]:
-                self.current_task = None
-        elif self.ready_queue:
+        # keep executing the current task until it completes
+        if self.current_task is None and self.ready_queue:
             # Pick the next task from the ready queue
             _, task_index = heappop(self.ready_queue)
             self.current_task = task_index
-            self.execute_task(task_index)
-            if not self.is_active[self.current_task]:
-                self.current_task = None
 
     """
     Preemptive scheduling logic.
     """
 
     def _preemptive_step(self):
-        # Remove completed tasks from queue
-        while self.ready_queue and not self.is_active[self.ready_queue[0][1]]:
-            heappop(self.ready_queue)
-        if self.ready_queue:
-            _, task_index = heappop(self.ready_queue)
-            self.execute_task(task_index)
-            if self.is_active[task_index]:
-                heappush(
-                    self.ready_queue,
-                    (self.get_task_priority(task_index)[0], task_index),
-                )
+        # the running task stays out of the ready queue until it is preempted,
+        # so the queue only holds active tasks waiting for the processor
+        if not self.ready_queue:
+            return
+        if self.current_task is None:
+            _, self.current_task = heappop(self.ready_queue)
+        else:
+            # preempt only if a ready task has higher priority than the running one
+            current_priority = self.get_task_priority(self.current_task)
+            if self.ready_queue[0] < current_priority:
+                _, self.current_task = heapreplace(self.ready_queue, current_priority)
 
 
 """
@@ -173,28 +228,28 @@ function to load the task sets from the input file
 
 
 def load_tasks(input_file):
-    tasks = []
+    # read the whole file and split it into tokens at once (empty lines are skipped)
     with open(input_file, "r") as file:
-        for i, line in enumerate(file):
-            # skip empty lines
-            line = line.strip()
-            if not line:
-                continue
-
-            # read metadata from the first line
-            if i == 0:
-                metadata = line.split()[:3]
-                num_tasks = int(metadata[0])
-
-            # read task set from the subsequent lines
-            data = list(map(int, line.split()[3:]))
-            task_set = [
-                (data[j * 3], data[j * 3 + 1], data[j * 3 + 2])
-                for j in range(num_tasks)
-            ]
-
-            # append the task set to the tasks list
-            tasks.append(task_set)
+        tokens = file.read().split()
+
+    if not tokens:
+        return []
+
+    # read metadata from the first line
+    num_tasks = int(tokens[0])
+
+    # every line has 3 metadata elements followed by 3 elements per task
+    line_length = 3 + 3 * num_tasks
+
+    tasks = []
+    for start in range(0, len(tokens), line_length):
+
+        # read task set from the line (skipping the metadata)
+        data = list(map(int, tokens[start + 3 : start + line_length]))
+        task_set = list(zip(data[0::3], data[1::3], data[2::3]))
+
+        # append the task set to the tasks list
+        tasks.append(task_set)
 
     return tasks
 
@@ -246,9 +301,9 @@ used for multiprocessing
 
 
 def process_task_set(args):
-    task_set, scheduling_algorithm, preemptive = args
+    index, task_set, scheduling_algorithm, preemptive = args
     scheduler = TaskScheduler(task_set, scheduling_algorithm, preemptive)
-    return scheduler.simulate()
+    return index, scheduler.simulate()
 
 
 """
@@ -275,24 +330,30 @@ def main():
     os.makedirs(output_dir, exist_ok=True)
     filename = f"{output_dir}/2020310083_HW2.txt"
 
-    # set the arguments for multiprocessing
+    # set the arguments for multiprocessing (index is used to keep the input order)
     task_set_args = [
-        (task_set, scheduling_algorithm, preemptive) for task_set in task_sets
+        (index, task_set, scheduling_algorithm, preemptive)
+        for index, task_set in enumerate(task_sets)
     ]
 
-    # process the task sets using multiprocessing using imap (efficient memory usage)
-    results = []
+    # send several task sets per worker call to amortize the dispatch overhead
+    chunksize = max(1, len(task_set_args) // ((os.cpu_count() or 1) * 4))
+
+    # process the task sets using multiprocessing using imap_unordered (efficient memory usage)
+    # and place each result back at its task set index
+    results = [None] * len(task_set_args)
     with Pool() as pool:
-        for result in pool.imap(process_task_set, task_set_args):
-            results.append(result)
+        for index, result in pool.imap_unordered(
+            process_task_set, task_set_args, chunksize=chunksize
+        ):
+            results[index] = result
 
     # with Pool() as pool:
     #     results = pool.map(process_task_set, task_set_args)
 
     # write the results to the output file
     with open(filename, "w") as file:
-        for result in results:
-            file.write(f"{result}\n")
+        file.write("".join(f"{result}\n" for result in results))
 
     # stop the timer and print the execution time
     end = time.time()
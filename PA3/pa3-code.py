@@ -2,31 +2,33 @@ import os
 import sys
 import math
 from multiprocessing import Pool
-from functools import partial, reduce
-from dataclasses import dataclass
+from functools import partial
+from operator import itemgetter
+from heapq import heappush, heapreplace
 
 
-@dataclass
-class Task:
+def calculate_hyperperiod(periods, limit=None):
     """
-    Represents a real-time task with timing constraints.
-
-    Attributes:
-        index (int): Unique identifier for the task
-        period (int): Task's Period
-        wcet (int): Task's Worst-Case Execution Time
-        relative_deadline (int): Task's Relative Deadline
-        utilization (float): Task's Utilization
+    Calculates the hyperperiod (LCM of periods) of the task set.
+
+    The LCM is folded over the distinct periods in increasing order and the
+    calculation stops as soon as the partial LCM exceeds the limit.
+
+    Args:
+        periods (list): Task periods
+        limit (int): Largest hyperperiod of interest, None for no limit
+
+    Returns:
+        int: the hyperperiod, or None if it exceeds the limit
     """
 
-    index: int
-    period: int
-    wcet: int
-    relative_deadline: int
+    hyperperiod = 1
+    for period in sorted(set(periods)):
+        hyperperiod = math.lcm(hyperperiod, period)
+        if limit is not None and hyperperiod > limit:
+            return None
 
-    @property
-    def utilization(self):
-        return self.wcet / self.period
+    return hyperperiod
 
 
 class TasksetAnalyzer:
@@ -39,20 +41,30 @@ class TasksetAnalyzer:
     - Constrained DM Response Time Analysis
     - Implicit EDF Utilization Bound Analysis
     - Constrained EDF Processor Demand Criterion
+
+    A task set is a list of (period, WCET, relative deadline) tuples
+    in task index order.
     """
 
     def __init__(self, task_set, scheduling_algorithm, analysis):
 
         # sort the task based on the scheduling algorithm (no need to sort for EDF)
+        # sorting is stable, so tasks with the same key stay in index order
         if scheduling_algorithm == "RM":
-            self.task_set = sorted(task_set, key=lambda task: (task.period, task.index))
+            self.task_set = sorted(task_set, key=itemgetter(0))
         elif scheduling_algorithm == "DM":
-            self.task_set = sorted(
-                task_set, key=lambda task: (task.relative_deadline, task.index)
-            )
+            self.task_set = sorted(task_set, key=itemgetter(2))
         else:
             self.task_set = task_set
 
+        # task parameters as separate lists in priority order (used in the analysis loops)
+        self.periods = [period for period, _, _ in self.task_set]
+        self.wcets = [wcet for _, wcet, _ in self.task_set]
+        self.relative_deadlines = [deadline for _, _, deadline in self.task_set]
+        self.utilizations = [
+            wcet / period for period, wcet in zip(self.periods, self.wcets)
+        ]
+
         # other attributes
         self.scheduling_algorithm = scheduling_algorithm
         self.analysis = analysis
@@ -65,7 +77,44 @@ class TasksetAnalyzer:
             str: 'P' if schedulable (utilization ≤ 1), 'F' otherwise
         """
 
-        return "P" if sum(task.utilization for task in self.task_set) <= 1 else "F"
+        # every utilization is positive, so stop as soon as the running sum exceeds 1
+        total_utilization = 0
+        for utilization in self.utilizations:
+            total_utilization += utilization
+            if total_utilization > 1:
+                return "F"
+
+        return "P"
+
+    def hyperbolic_bound_test(self):
+        """
+        Checks the sufficient hyperbolic bound for Implicit RM (Bini et al., 2003).
+        It accepts every task set accepted by the Liu & Layland bound.
+
+        prod(U_i + 1) <= 2 is evaluated exactly with integers
+        as prod(C_i + T_i) <= 2 * prod(T_i).
+
+        Returns:
+            bool: True if schedulable, False if inconclusive
+        """
+
+        return math.prod(
+            wcet + period for period, wcet in zip(self.periods, self.wcets)
+        ) <= 2 * math.prod(self.periods)
+
+    def rate_monotonic_analysis(self):
+        """
+        Performs Implicit RM analysis.
+
+        Skips the response time analysis if the sufficient hyperbolic bound already holds.
+
+        Returns:
+            str: 'P' if schedulable, 'F' otherwise
+        """
+
+        if self.hyperbolic_bound_test():
+            return "P"
+        return self.response_time_analysis()
 
     def response_time_analysis(self):
         """
@@ -81,24 +130,45 @@ class TasksetAnalyzer:
             str: 'P' if schedulable, 'F' otherwise
         """
 
-        for i, task in enumerate(self.task_set):
+        periods, wcets = self.periods, self.wcets
+
+        # end of the released jobs of each higher priority task (ceil(R / T_j) * T_j),
+        # earliest first, and the resulting interference, carried over from one task
+        # to the next since the response time only grows along the priority order
+        release_boundaries = []
+        interference = 0
+
+        # converged response time of the previous (next higher priority) task
+        R_higher = 0
 
-            # initialize the response time to the task's WCET (R_i^0 = C_i)
-            R_previous = task.wcet
+        for i, (wcet, relative_deadline) in enumerate(
+            zip(wcets, self.relative_deadlines)
+        ):
+
+            # the previous task joins the higher priority tasks (no releases counted yet)
+            if i > 0:
+                heappush(release_boundaries, (0, i - 1))
+
+            # initialize the response time to R_i^0 = R_(i-1) + C_i instead of C_i,
+            # a lower bound of R_i since task i suffers all the interference of task i-1
+            # and is also delayed by task i-1 itself (Sjodin & Hansson, 1998)
+            R_previous = R_higher + wcet
 
             while True:
 
-                # Calculate interference from higher priority tasks
-                interference = sum(
-                    math.ceil(R_previous / HP_task.period) * HP_task.wcet
-                    for HP_task in self.task_set[:i]
-                )
+                # update interference only for tasks released again in [0, R_previous),
+                # i.e. whose release boundary is before R_previous
+                while release_boundaries and release_boundaries[0][0] < R_previous:
+                    boundary, j = release_boundaries[0]
+                    k = -(-R_previous // periods[j])
+                    interference += (k - boundary // periods[j]) * wcets[j]
+                    heapreplace(release_boundaries, (k * periods[j], j))
 
                 # calculate the current step of response time
-                R_current = task.wcet + interference
+                R_current = wcet + interference
 
                 # check the convergence and condition that R <= D (can be early stopped before converge)
-                if R_current > task.relative_deadline:
+                if R_current > relative_deadline:
                     return "F"
                 elif R_current == R_previous:
                     break
@@ -106,80 +176,132 @@ class TasksetAnalyzer:
                 # update R_i^k to R_i^(k+1) for next while iteration
                 R_previous = R_current
 
+            R_higher = R_current
+
         return "P"
 
     def processor_demand_criterion(self):
         """
         Performs Explicit EDF processor demand criterion analysis.
-        Uses min(hyperperiod, L*) as the upper bound for interval L.
+        Uses min(hyperperiod, L*) as the upper bound for interval L and
+        checks the absolute deadlines below it with QPA.
 
         Returns:
             str: 'P' if schedulable, 'F' otherwise
         """
-        # Calculate hyperperiod
-        hyperperiod = reduce(
-            lambda x, y: x * y // math.gcd(x, y),
-            [task.period for task in self.task_set],
-        )
-
         # Calculate L* = (sum((Ti - Di)Ui))/(1-U)
-        total_utilization = sum(task.utilization for task in self.task_set)
+        total_utilization = sum(self.utilizations)
         if total_utilization > 1:
             return "F"
 
         # cannot calculate L* if the total utilization is 1 (infinite L*)
         if total_utilization != 1:
             l_star = sum(
-                (task.period - task.relative_deadline) * task.utilization
-                for task in self.task_set
+                (period - relative_deadline) * utilization
+                for period, relative_deadline, utilization in zip(
+                    self.periods, self.relative_deadlines, self.utilizations
+                )
             ) / (1 - total_utilization)
 
             # Use the minimum of hyperperiod and L* as the upper bound
-            upper_bound = min(hyperperiod, math.ceil(l_star))
+            # (the hyperperiod is not needed once it is known to exceed L*)
+            l_star_bound = math.ceil(l_star)
+            hyperperiod = calculate_hyperperiod(self.periods, limit=l_star_bound)
+            upper_bound = l_star_bound if hyperperiod is None else hyperperiod
 
         else:
-            upper_bound = hyperperiod
-
-        # All possible interval candidates up to the upper bound
-        interval_candidates = sorted(
-            {
-                task.relative_deadline + k * task.period
-                for task in self.task_set
-                for k in range(upper_bound // task.period + 1)
-                if task.relative_deadline + k * task.period <= upper_bound
-            }
-        )
+            upper_bound = calculate_hyperperiod(self.periods)
 
-        # Iterate over all possible interval candidates and check if g(0, interval) <= interval
-        for interval in interval_candidates:
+        # Quick Processor-demand Analysis (QPA, Zhang & Burns 2009):
+        # start from the last absolute deadline within the upper bound and move backwards.
+        # if g(0, L) < L, no interval in [g(0, L), L] can fail, so jump to L = g(0, L),
+        # otherwise (g(0, L) == L) step to the previous absolute deadline
+        min_deadline = min(self.relative_deadlines)
+        interval = self._previous_deadline(upper_bound + 1)
+        while interval is not None:
 
             # Calculate the total demand g(0, interval)
-            total_demand = sum(
-                math.floor(
-                    (interval - task.relative_deadline + task.period) / task.period
-                )
-                * task.wcet
-                for task in self.task_set
-            )
+            total_demand = self._processor_demand(interval)
 
             # check if g(0, interval) <= interval, if not, the task set is not schedulable
             if total_demand > interval:
                 return "F"
 
+            # every interval below the first deadline has no demand
+            if total_demand <= min_deadline:
+                break
+
+            if total_demand < interval:
+                interval = total_demand
+            else:
+                interval = self._previous_deadline(interval)
+
         return "P"
 
+    def _processor_demand(self, interval):
+        """
+        Calculates the processor demand g(0, interval) of the synchronous task set.
+
+        Returns:
+            int: total WCET of the jobs with absolute deadline <= interval
+        """
+
+        return sum(
+            ((interval - relative_deadline + period) // period) * wcet
+            for period, wcet, relative_deadline in self.task_set
+            if relative_deadline <= interval
+        )
+
+    def _previous_deadline(self, interval):
+        """
+        Finds the latest absolute deadline (D_i + k * T_i) strictly before the interval.
+
+        Returns:
+            int: the absolute deadline, or None if there is no deadline before the interval
+        """
+
+        return max(
+            (
+                relative_deadline
+                + (interval - relative_deadline - 1) // period * period
+                for period, _, relative_deadline in self.task_set
+                if relative_deadline < interval
+            ),
+            default=None,
+        )
+
     def analyze(self):
         """
         Analyzes the task set and returns the schedulability result.
         """
 
-        if self.scheduling_algorithm == "EDF":
-            if self.analysis == "U":
-                return self.utilization_bound_analysis()
-            else:  # D
-                return self.processor_demand_criterion()
-        else:  # RM or DM --> R
-            return self.response_time_analysis()
+        return select_analysis_method(self.scheduling_algorithm, self.analysis)(self)
+
+
+def select_analysis_method(scheduling_algorithm, analysis):
+    """
+    Selects the TasksetAnalyzer method for the [scheduling_algorithm analysis] pair.
+
+    The pair is fixed for a whole run, so main() resolves it once
+    instead of dispatching again for every task set.
+
+    Args:
+        scheduling_algorithm (str): 'RM', 'DM', or 'EDF'
+        analysis (str): 'U', 'R', or 'D'
+
+    Returns:
+        function: TasksetAnalyzer method taking the analyzer as its only argument
+    """
+
+    if scheduling_algorithm == "EDF":
+        if analysis == "U":
+            return TasksetAnalyzer.utilization_bound_analysis
+        else:  # D
+            return TasksetAnalyzer.processor_demand_criterion
+    elif scheduling_algorithm == "RM":
+        return TasksetAnalyzer.rate_monotonic_analysis
+    else:  # DM --> R
+        return TasksetAnalyzer.response_time_analysis
 
 
 def get_user_input():
@@ -238,37 +360,30 @@ def load_tasks(input_file):
 
     Returns:
         tuple: (list of task sets, is_constrained_deadline flag)
+            each task set is a list of (period, WCET, relative deadline) tuples
     """
 
-    task_sets = []
+    # read the whole file and split it into tokens at once (empty lines are skipped)
     with open(input_file, "r") as file:
+        tokens = file.read().split()
 
-        for i, line in enumerate(file):
-            # skip empty lines
-            line = line.strip()
-            if not line:
-                continue
-
-            # read metadata from the first line
-            if i == 0:
-                metadata = line.split()[:3]
-                num_tasks = int(metadata[0])
-                is_constrained_deadline = int(metadata[2])
-
-            # read task set from the subsequent lines
-            data = list(map(int, line.split()[3:]))
-
-            task_set = [
-                Task(
-                    index,  # index
-                    data[index * 3],  # period
-                    data[index * 3 + 1],  # WCET
-                    data[index * 3 + 2],  # relative deadline
-                )
-                for index in range(num_tasks)
-            ]
+    # read metadata from the first line
+    num_tasks = int(tokens[0])
+    is_constrained_deadline = int(tokens[2])
+
+    # every line has 3 metadata elements followed by 3 elements per task
+    line_length = 3 + 3 * num_tasks
+
+    task_sets = []
+    for start in range(0, len(tokens), line_length):
+
+        # read task set from the line (skipping the metadata)
+        data = list(map(int, tokens[start + 3 : start + line_length]))
 
-            task_sets.append(task_set)
+        # task set as (period, WCET, relative deadline) tuples of plain ints
+        task_set = list(zip(data[0::3], data[1::3], data[2::3]))
+
+        task_sets.append(task_set)
 
     return task_sets, is_constrained_deadline
 
@@ -287,27 +402,48 @@ def generate_output_file(result):
     os.makedirs("./output", exist_ok=True)
     output_file = os.path.join("./output", "2020310083_HW3.txt")
     with open(output_file, "w") as file:
-        for line in result:
-            file.write(line + "\n")
+        file.write("".join(line + "\n" for line in result))
 
 
-def analyze_task_set(task_set, scheduling_algorithm, analysis):
+def analyze_task_set(task_set, scheduling_algorithm, analysis, analysis_method=None):
     """
     Analyzes a single task set using specified algorithm and method.
 
     Helper function for parallel processing.
 
     Args:
-        task_set (list): List of Task objects
+        task_set (list): List of (period, WCET, relative deadline) tuples
         scheduling_algorithm (str): 'RM', 'DM', or 'EDF'
         analysis (str): 'U', 'R', or 'D'
+        analysis_method (function): method from select_analysis_method,
+            None to select it from the pair
 
     Returns:
         str: Schedulability result ('P' or 'F')
     """
 
     analyzer = TasksetAnalyzer(task_set, scheduling_algorithm, analysis)
-    return analyzer.analyze()
+    if analysis_method is None:
+        return analyzer.analyze()
+    return analysis_method(analyzer)
+
+
+def analyze_indexed_task_set(indexed_task_set, analyze_with_args):
+    """
+    Analyzes a task set tagged with its position in the input file.
+
+    Helper function for unordered parallel processing.
+
+    Args:
+        indexed_task_set (tuple): (index, task set)
+        analyze_with_args (callable): analyze_task_set with the algorithm and analysis fixed
+
+    Returns:
+        tuple: (index, schedulability result)
+    """
+
+    index, task_set = indexed_task_set
+    return index, analyze_with_args(task_set)
 
 
 def main():
@@ -339,19 +475,37 @@ def main():
         == is_constrained_deadline
     ):
 
-        result = []
+        # use partial to fix the unchanged arguments
+        # (the analysis method is selected once for all task sets)
+        analyze_with_args = partial(
+            analyze_task_set,
+            scheduling_algorithm=scheduling_algorithm,
+            analysis=analysis,
+            analysis_method=select_analysis_method(scheduling_algorithm, analysis),
+        )
 
-        with Pool() as pool:
+        # starting worker processes costs more than analyzing a few task sets
+        if len(task_sets) < 64:
+            result = [analyze_with_args(task_set) for task_set in task_sets]
 
-            # use partial to fix the unchanged arguments
-            analyze_with_args = partial(
-                analyze_task_set,
-                scheduling_algorithm=scheduling_algorithm,
-                analysis=analysis,
+        else:
+            # workers get (index, task set) pairs to place the results in input order
+            analyze_indexed_with_args = partial(
+                analyze_indexed_task_set, analyze_with_args=analyze_with_args
             )
 
-            # Use pool.imap to analyze task sets with multiprocessing
-            result = list(pool.imap(analyze_with_args, task_sets))
+            result = [None] * len(task_sets)
+            with Pool() as pool:
+
+                # send several task sets per worker call to amortize the dispatch overhead
+                chunksize = max(1, len(task_sets) // ((os.cpu_count() or 1) * 4))
+
+                # Use pool.imap_unordered so that a slow task set does not hold back
+                # the results of the others
+                for index, task_set_result in pool.imap_unordered(
+                    analyze_indexed_with_args, enumerate(task_sets), chunksize=chunksize
+                ):
+                    result[index] = task_set_result
 
         generate_output_file(result)
 